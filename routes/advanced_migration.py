@@ -113,22 +113,19 @@ def validate_migration(job_id):
         job = MigrationJob.query.get_or_404(job_id)
         mapping_config = job.mapping_configuration
         
-        # Create Oracle and Elasticsearch connections
-        oracle_conn = migration_service._create_oracle_connection(mapping_config.oracle_connection)
+        # Create Oracle and Elasticsearch connections; the pooled Oracle
+        # connection is released when the block exits, even on error
         es_client = migration_service._create_elasticsearch_client(mapping_config.elasticsearch_connection)
-        
-        # Initialize validator
-        validator = MigrationValidator(oracle_conn, es_client)
-        
-        # Run validation
-        validation_results = validator.validate_migration(
-            mapping_config.oracle_query,
-            mapping_config.elasticsearch_index,
-            sample_size=1000
-        )
-        
-        # Clean up connections
-        oracle_conn.close()
+        with migration_service._create_oracle_connection(mapping_config.oracle_connection) as oracle_conn:
+            # Initialize validator
+            validator = MigrationValidator(oracle_conn, es_client)
+            
+            # Run validation
+            validation_results = validator.validate_migration(
+                mapping_config.oracle_query,
+                mapping_config.elasticsearch_index,
+                sample_size=1000
+            )
         
         return jsonify(validation_results)
         
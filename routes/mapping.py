@@ -198,13 +198,13 @@ def analyze_schema():
         
         # Get Oracle connection and create service
         oracle_connection = OracleConnection.query.get_or_404(oracle_connection_id)
-        oracle_service = OracleService(oracle_connection)
         
         # Initialize advanced mapping service
         advanced_mapping_service = AdvancedMappingService()
         
         # Analyze schema
-        analysis = advanced_mapping_service.analyze_oracle_schema(oracle_service, oracle_query)
+        with OracleService(oracle_connection) as oracle_service:
+            analysis = advanced_mapping_service.analyze_oracle_schema(oracle_service, oracle_query)
         
         return jsonify(analysis)
         
@@ -52,9 +52,10 @@ def test_connection(connection_id):
     """Test Oracle connection"""
     try:
         connection = OracleConnection.query.get_or_404(connection_id)
-        oracle_service = OracleService(connection)
+        with OracleService(connection) as oracle_service:
+            connected = oracle_service.test_connection()
         
-        if oracle_service.test_connection():
+        if connected:
             return jsonify({'success': True, 'message': 'Connection successful'})
         else:
             return jsonify({'success': False, 'message': 'Connection failed'}), 400
@@ -67,9 +68,8 @@ def get_tables(connection_id):
     """Get all tables from Oracle connection"""
     try:
         connection = OracleConnection.query.get_or_404(connection_id)
-        oracle_service = OracleService(connection)
-        
-        tables = oracle_service.get_tables()
+        with OracleService(connection) as oracle_service:
+            tables = oracle_service.get_tables()
         return jsonify(tables)
     except Exception as e:
         logger.error(f"Error fetching Oracle tables: {str(e)}")
@@ -80,9 +80,8 @@ def get_table_columns(connection_id, table_name):
     """Get columns for a specific table"""
     try:
         connection = OracleConnection.query.get_or_404(connection_id)
-        oracle_service = OracleService(connection)
-        
-        columns = oracle_service.get_table_columns(table_name)
+        with OracleService(connection) as oracle_service:
+            columns = oracle_service.get_table_columns(table_name)
         return jsonify(columns)
     except Exception as e:
         logger.error(f"Error fetching table columns: {str(e)}")
@@ -93,13 +92,13 @@ def analyze_query(connection_id):
     """Analyze SQL query and extract column information"""
     try:
         connection = OracleConnection.query.get_or_404(connection_id)
-        oracle_service = OracleService(connection)
         
         query = (request.json or {}).get('query')
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        analysis = oracle_service.analyze_query(query)
+        with OracleService(connection) as oracle_service:
+            analysis = oracle_service.analyze_query(query)
         return jsonify(analysis)
     except Exception as e:
         logger.error(f"Error analyzing query: {str(e)}")
@@ -110,7 +109,6 @@ def execute_query(connection_id):
     """Execute SQL query and return sample results"""
     try:
         connection = OracleConnection.query.get_or_404(connection_id)
-        oracle_service = OracleService(connection)
         
         data = request.json or {}
         query = data.get('query')
@@ -119,7 +117,8 @@ def execute_query(connection_id):
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        results = oracle_service.execute_query(query, limit)
+        with OracleService(connection) as oracle_service:
+            results = oracle_service.execute_query(query, limit)
         return jsonify(results)
     except Exception as e:
         logger.error(f"Error executing query: {str(e)}")
@@ -5,12 +5,30 @@ Handles nested objects, parent-child relationships, and complex field mappings
 
 import json
 import logging
+import re
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Oracle type name (no precision/length) -> suggested Elasticsearch type
+_ES_TYPE_SUGGESTIONS = {
+    'VARCHAR2': 'text',
+    'VARCHAR': 'text',
+    'CHAR': 'keyword',
+    'NUMBER': 'long',
+    'INTEGER': 'integer',
+    'FLOAT': 'float',
+    'DATE': 'date',
+    'TIMESTAMP': 'date',
+    'CLOB': 'text',
+    'BLOB': 'binary',
+    'RAW': 'binary'
+}
+# Length of a VARCHAR/VARCHAR2 column, e.g. VARCHAR2(100)
+_VARCHAR_LENGTH_RE = re.compile(r'VARCHAR2?\((\d+)\)')
+
 class MappingType(Enum):
     DIRECT = "direct"
     NESTED = "nested"
@@ -488,43 +506,22 @@ class AdvancedMappingService:
         """Suggest Elasticsearch type from Oracle type"""
         oracle_type = oracle_type.upper()
         
-        type_mappings = {
-            'VARCHAR2': 'text',
-            'VARCHAR': 'text',
-            'CHAR': 'keyword',
-            'NUMBER': 'long',
-            'INTEGER': 'integer',
-            'FLOAT': 'float',
-            'DATE': 'date',
-            'TIMESTAMP': 'date',
-            'CLOB': 'text',
-            'BLOB': 'binary',
-            'RAW': 'binary'
-        }
+        # Plain type names resolve with a single lookup
+        es_type = _ES_TYPE_SUGGESTIONS.get(oracle_type)
+        if es_type is not None:
+            return es_type
         
         # Handle NUMBER with precision
         if oracle_type.startswith('NUMBER'):
-            if ',' in oracle_type:  # Has decimal places
-                return 'scaled_float'
-            else:
-                return 'long'
-        
-        # Handle VARCHAR2 with length
-        if oracle_type.startswith('VARCHAR2') or oracle_type.startswith('VARCHAR'):
-            # Extract length if available
-            if '(' in oracle_type:
-                try:
-                    length_str = oracle_type.split('(')[1].split(')')[0]
-                    length = int(length_str)
-                    if length <= 256:
-                        return 'keyword'
-                    else:
-                        return 'text'
-                except:
-                    pass
-            return 'text'
-        
-        return type_mappings.get(oracle_type, 'text')
+            return 'scaled_float' if ',' in oracle_type else 'long'
+        
+        # Handle VARCHAR2 with length: short strings are better as keywords
+        if oracle_type.startswith('VARCHAR'):
+            match = _VARCHAR_LENGTH_RE.match(oracle_type)
+            if match:
+                return 'keyword' if int(match.group(1)) <= 256 else 'text'
+        
+        return 'text'
     
     def _calculate_mapping_confidence(self, field_name: str, oracle_type: str) -> int:
         """Calculate confidence score for mapping suggestion"""
@@ -3,13 +3,18 @@ Advanced Migration Service for Oracle to Elasticsearch
 Implements sophisticated migration strategies, monitoring, and error handling
 """
 
+import base64
+import hashlib
 import json
 import logging
 import threading
 import time
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain
 from typing import Dict, List, Optional, Any, Generator, Tuple
 import os
 import glob
@@ -18,10 +23,109 @@ from elasticsearch import Elasticsearch
 from elasticsearch.helpers import bulk, parallel_bulk
 import oracledb
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast path
+    orjson = None
+
 from models import MigrationJob, MappingConfiguration, db
 
 logger = logging.getLogger(__name__)
 
+def _unchanged(value):
+    return value
+
+def _to_isoformat(value):
+    """Render Oracle DATE/TIMESTAMP values as ISO 8601 strings"""
+    return value.isoformat()
+
+def _encode_binary(content):
+    """Base64 encode binary column data for the JSON source"""
+    # For binary data, consider base64 encoding or external storage
+    return base64.b64encode(content).decode('utf-8')
+
+def _read_lob(value):
+    """Read Oracle CLOB/BLOB content; binary data is base64 encoded"""
+    try:
+        content = value.read()
+        if isinstance(content, bytes):
+            return _encode_binary(content)
+        return content
+    except Exception as e:
+        logger.warning(f"Failed to read LOB data: {e}")
+        return None
+
+def _converter_for_type(value_type: type):
+    """Pick the Elasticsearch conversion for values of an Oracle-fetched type"""
+    # Handle Oracle DATE/TIMESTAMP
+    if hasattr(value_type, 'isoformat'):
+        return _to_isoformat
+    
+    # Handle Oracle NUMBER with decimals
+    if issubclass(value_type, (int, float)):
+        return _unchanged
+    
+    # Handle Oracle CLOB/BLOB
+    if hasattr(value_type, 'read'):
+        return _read_lob
+    
+    # Convert to string for complex types
+    if not issubclass(value_type, (str, int, float, bool, list, dict)):
+        return str
+    
+    return _unchanged
+
+# Python type -> converter, filled in as new types are seen
+_VALUE_CONVERTERS = {}
+
+@lru_cache(maxsize=256)
+def _row_builder(column_names: Tuple[str, ...]):
+    """Generate (once per column list) a function turning a fetched row tuple into a dict
+    
+    The body is a single dict literal, {'col': row[0], ...}, which builds
+    rows faster than dict(zip(column_names, row)) with the same result.
+    """
+    items = ", ".join(f"{name!r}: row[{i}]" for i, name in enumerate(column_names))
+    namespace = {}
+    exec(compile(f"def build_row(row):\n    return {{{items}}}", '<row-builder>', 'exec'), namespace)
+    return namespace['build_row']
+
+def _lob_output_type_handler(cursor, name, default_type, size, precision, scale):
+    """Fetch LOB columns inline with the row instead of as LOB locators
+    
+    Each locator would otherwise cost a round-trip to read; BLOBs arrive
+    already base64 encoded, as _read_lob would have produced them.
+    """
+    if default_type == oracledb.DB_TYPE_CLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if default_type == oracledb.DB_TYPE_NCLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_NVARCHAR, arraysize=cursor.arraysize)
+    if default_type == oracledb.DB_TYPE_BLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize,
+                          outconverter=_encode_binary)
+
+# cursor.description type code -> compatible Elasticsearch types; keyed by the
+# individual DB_TYPE_* codes the driver reports, not the STRING/NUMBER groups
+_COMPATIBLE_ES_TYPES = {
+    **dict.fromkeys(
+        (oracledb.DB_TYPE_CHAR, oracledb.DB_TYPE_NCHAR, oracledb.DB_TYPE_VARCHAR,
+         oracledb.DB_TYPE_NVARCHAR, oracledb.DB_TYPE_LONG),
+        ('text', 'keyword')
+    ),
+    **dict.fromkeys(
+        (oracledb.DB_TYPE_NUMBER, oracledb.DB_TYPE_BINARY_INTEGER,
+         oracledb.DB_TYPE_BINARY_FLOAT, oracledb.DB_TYPE_BINARY_DOUBLE),
+        ('long', 'integer', 'double', 'float')
+    ),
+    **dict.fromkeys(
+        (oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP,
+         oracledb.DB_TYPE_TIMESTAMP_TZ, oracledb.DB_TYPE_TIMESTAMP_LTZ),
+        ('date',)
+    ),
+    oracledb.DB_TYPE_CLOB: ('text',),
+    oracledb.DB_TYPE_BLOB: ('binary',)
+}
+
 @dataclass
 class MigrationMetrics:
     """Comprehensive migration metrics tracking"""
@@ -108,6 +212,20 @@ class DeadLetterQueue:
 class AdvancedMigrationService:
     """Advanced migration service with comprehensive features"""
     
+    # Oracle session pools shared by all jobs, one per database/user:
+    # key -> (pool, credential digest)
+    _oracle_pools = {}
+    # Pools replaced after a credential change, closed once their sessions return
+    _retired_oracle_pools = []
+    _oracle_pools_lock = threading.Lock()
+    # Sessions each pool may open
+    ORACLE_POOL_MIN = 1
+    ORACLE_POOL_MAX = 4
+    # Milliseconds to wait for a free pooled session before giving up
+    ORACLE_POOL_WAIT_TIMEOUT_MS = 30000
+    # Parsed statements each pooled session keeps for reuse
+    ORACLE_STMT_CACHE_SIZE = 40
+    
     def __init__(self, batch_size: int = 5000, max_workers: int = 4):
         self.batch_size = batch_size
         self.max_workers = max_workers
@@ -171,10 +289,10 @@ class AdvancedMigrationService:
         mapping_config = job.mapping_configuration
         
         # Get total record count
-        cursor = oracle_conn.cursor()
         count_query = f"SELECT COUNT(*) FROM ({mapping_config.oracle_query})"
-        cursor.execute(count_query)
-        total_count = cursor.fetchone()[0]
+        with oracle_conn.cursor() as cursor:
+            cursor.execute(count_query)
+            total_count = cursor.fetchone()[0]
         
         with self.metrics_lock:
             self.metrics.total_records = total_count
@@ -225,13 +343,15 @@ class AdvancedMigrationService:
         # Get last sync timestamp from job or configuration
         last_sync = self._get_last_sync_timestamp(job)
         
-        # Build incremental query
+        # Build incremental query; the timestamp is bound so every run
+        # reuses the same statement
         incremental_query = self._build_incremental_query(mapping_config.oracle_query, last_sync)
         
         logger.info(f"Starting incremental migration from {last_sync}")
         
         # Process incremental changes
-        for batch_data in self._stream_oracle_data(oracle_conn, incremental_query):
+        for batch_data in self._stream_oracle_data(oracle_conn, incremental_query,
+                                                   params={'last_sync': last_sync}):
             if self.stop_event.is_set():
                 break
             
@@ -263,26 +383,30 @@ class AdvancedMigrationService:
             logger.info("Hybrid migration completed. Set up for incremental updates.")
     
     def _stream_oracle_data(self, oracle_conn, query: str, 
-                           fetch_size: int = None) -> Generator[List[Dict], None, None]:
-        """Stream data from Oracle in batches"""
+                           fetch_size: int = None,
+                           params: Optional[Dict[str, Any]] = None) -> Generator[List[Dict], None, None]:
+        """Stream data from Oracle in batches, binding params to the query"""
         if fetch_size is None:
             fetch_size = self.batch_size
         
-        cursor = oracle_conn.cursor()
-        cursor.arraysize = fetch_size
-        cursor.execute(query)
-        
-        # Get column names
-        column_names = [desc[0].lower() for desc in cursor.description]
-        
-        while True:
-            rows = cursor.fetchmany(fetch_size)
-            if not rows:
-                break
+        # The cursor is closed when the stream is exhausted or abandoned
+        with oracle_conn.cursor() as cursor:
+            cursor.arraysize = fetch_size
+            cursor.prefetchrows = fetch_size + 1
+            cursor.outputtypehandler = _lob_output_type_handler
+            cursor.execute(query, params or {})
+            
+            # Get column names
+            build_row = _row_builder(tuple(desc[0].lower() for desc in cursor.description))
             
-            # Convert rows to dictionaries
-            batch = [dict(zip(column_names, row)) for row in rows]
-            yield batch
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                
+                # Convert rows to dictionaries
+                batch = list(map(build_row, rows))
+                yield batch
     
     def _transform_batch(self, batch_data: List[Dict], 
                         mapping_config: MappingConfiguration) -> List[Dict]:
@@ -435,32 +559,13 @@ class AdvancedMigrationService:
         if value is None:
             return None
         
-        # Handle Oracle DATE/TIMESTAMP
-        if hasattr(value, 'isoformat'):
-            return value.isoformat()
-        
-        # Handle Oracle NUMBER with decimals
-        if isinstance(value, (int, float)):
-            return value
-        
-        # Handle Oracle CLOB/BLOB
-        if hasattr(value, 'read'):
-            try:
-                content = value.read()
-                if isinstance(content, bytes):
-                    # For binary data, consider base64 encoding or external storage
-                    import base64
-                    return base64.b64encode(content).decode('utf-8')
-                return content
-            except Exception as e:
-                logger.warning(f"Failed to read LOB data: {e}")
-                return None
-        
-        # Convert to string for complex types
-        if not isinstance(value, (str, int, float, bool, list, dict)):
-            return str(value)
-        
-        return value
+        # Values of one Python type always take the same conversion, so the
+        # type checks run once per type rather than once per cell
+        value_type = type(value)
+        converter = _VALUE_CONVERTERS.get(value_type)
+        if converter is None:
+            converter = _VALUE_CONVERTERS[value_type] = _converter_for_type(value_type)
+        return converter(value)
     
     def _prepare_elasticsearch_index(self, es_client, mapping_config: MappingConfiguration):
         """Prepare Elasticsearch index with optimized settings"""
@@ -520,21 +625,71 @@ class AdvancedMigrationService:
         logger.info(f"Created index {index_name} with optimized settings")
     
     def _create_oracle_connection(self, oracle_conn_config):
-        """Create Oracle database connection"""
-        dsn = oracledb.makedsn(
+        """Acquire an Oracle connection from the shared pool for this database
+        
+        Closing the returned connection releases it back to the pool, so
+        later jobs skip the connect/authenticate round-trips. When every
+        session is busy for ORACLE_POOL_WAIT_TIMEOUT_MS a RuntimeError is
+        raised instead of waiting indefinitely.
+        """
+        key = (
             oracle_conn_config.host,
             oracle_conn_config.port,
-            service_name=oracle_conn_config.service_name
+            oracle_conn_config.service_name,
+            oracle_conn_config.username
         )
+        # Only a digest is kept, to notice password changes
+        credentials = hashlib.sha256((oracle_conn_config.password or '').encode()).digest()
         
-        connection = oracledb.connect(
-            user=oracle_conn_config.username,
-            password=oracle_conn_config.password,
-            dsn=dsn,
-            encoding="UTF-8"
-        )
+        with self._oracle_pools_lock:
+            self._close_retired_oracle_pools()
+            
+            pool, pool_credentials = self._oracle_pools.get(key, (None, None))
+            if pool is not None and pool_credentials != credentials:
+                # Sessions still in use by running jobs keep the old pool open
+                self._retired_oracle_pools.append(pool)
+                self._close_retired_oracle_pools()
+                pool = None
+            
+            if pool is None:
+                dsn = oracledb.makedsn(
+                    oracle_conn_config.host,
+                    oracle_conn_config.port,
+                    service_name=oracle_conn_config.service_name
+                )
+                
+                pool = oracledb.create_pool(
+                    user=oracle_conn_config.username,
+                    password=oracle_conn_config.password,
+                    dsn=dsn,
+                    min=self.ORACLE_POOL_MIN,
+                    max=self.ORACLE_POOL_MAX,
+                    increment=1,
+                    getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                    wait_timeout=self.ORACLE_POOL_WAIT_TIMEOUT_MS,
+                    stmtcachesize=self.ORACLE_STMT_CACHE_SIZE
+                )
+                self._oracle_pools[key] = (pool, credentials)
         
-        return connection
+        try:
+            return pool.acquire()
+        except oracledb.Error as e:
+            raise RuntimeError(
+                f"No Oracle session available for {oracle_conn_config.host}:{oracle_conn_config.port}/"
+                f"{oracle_conn_config.service_name} after {self.ORACLE_POOL_WAIT_TIMEOUT_MS / 1000:g}s "
+                f"({self.ORACLE_POOL_MAX} in use): {e}"
+            ) from e
+    
+    def _close_retired_oracle_pools(self):
+        """Close replaced pools whose sessions have all been released (lock held)"""
+        still_busy = []
+        for pool in self._retired_oracle_pools:
+            try:
+                pool.close()
+            except oracledb.Error:
+                # Raised while sessions are checked out; retried on the next acquire
+                still_busy.append(pool)
+        self._retired_oracle_pools[:] = still_busy
     
     def _create_elasticsearch_client(self, es_conn_config):
         """Create Elasticsearch client"""
@@ -568,15 +723,13 @@ class AdvancedMigrationService:
         logger.info(f"Updated last sync timestamp to {timestamp}")
     
     def _build_incremental_query(self, base_query: str, last_sync: datetime) -> str:
-        """Build incremental query with timestamp filter"""
+        """Build incremental query with a :last_sync timestamp filter"""
         # This is a simplified approach - in reality, you'd need to analyze
         # the query structure and add appropriate WHERE clauses
-        timestamp_str = last_sync.strftime('%Y-%m-%d %H:%M:%S')
-        
         if 'WHERE' in base_query.upper():
-            return f"{base_query} AND updated_date > TO_DATE('{timestamp_str}', 'YYYY-MM-DD HH24:MI:SS')"
+            return f"{base_query} AND updated_date > :last_sync"
         else:
-            return f"{base_query} WHERE updated_date > TO_DATE('{timestamp_str}', 'YYYY-MM-DD HH24:MI:SS')"
+            return f"{base_query} WHERE updated_date > :last_sync"
     
     def stop_migration(self):
         """Stop the currently running migration"""
@@ -630,9 +783,18 @@ class AdvancedMigrationService:
 class MigrationValidator:
     """Validates migration results and data integrity"""
     
+    # Re-rank compared fields by mismatch frequency every N mismatches
+    COMPARE_REORDER_INTERVAL = 100
+    # Upper bound on rows fetched per Oracle round-trip
+    FETCH_ARRAYSIZE = 5000
+    
     def __init__(self, oracle_conn, es_client):
         self.oracle_conn = oracle_conn
         self.es_client = es_client
+        self._field_miss_counts = Counter()
+        self._compare_order: List[str] = []
+        self._compare_order_set = frozenset()
+        self._misses = 0
     
     def validate_migration(self, oracle_query: str, es_index: str, 
                           sample_size: int = 1000) -> Dict:
@@ -661,9 +823,9 @@ class MigrationValidator:
         """Validate record counts match between Oracle and Elasticsearch"""
         try:
             # Oracle count
-            cursor = self.oracle_conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM ({oracle_query})")
-            oracle_count = cursor.fetchone()[0]
+            with self.oracle_conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM ({oracle_query})")
+                oracle_count = cursor.fetchone()[0]
             
             # Elasticsearch count
             es_result = self.es_client.count(index=es_index)
@@ -695,19 +857,22 @@ class MigrationValidator:
             sample_query = f"""
                 SELECT * FROM (
                     SELECT * FROM ({oracle_query}) ORDER BY DBMS_RANDOM.VALUE
-                ) WHERE ROWNUM <= {sample_size}
+                ) WHERE ROWNUM <= :sample_size
             """
             
-            cursor = self.oracle_conn.cursor()
-            cursor.execute(sample_query)
-            oracle_records = cursor.fetchall()
-            column_names = [desc[0].lower() for desc in cursor.description]
+            # Pull the whole sample in as few round-trips as possible
+            with self.oracle_conn.cursor() as cursor:
+                cursor.arraysize = min(sample_size, self.FETCH_ARRAYSIZE)
+                cursor.prefetchrows = cursor.arraysize + 1
+                cursor.execute(sample_query, sample_size=sample_size)
+                oracle_records = cursor.fetchall()
+                build_row = _row_builder(tuple(desc[0].lower() for desc in cursor.description))
             
             matching_records = 0
             total_checked = 0
             
             for record in oracle_records:
-                oracle_doc = dict(zip(column_names, record))
+                oracle_doc = build_row(record)
                 
                 # Find corresponding ES document (assuming 'id' field exists)
                 if 'id' in oracle_doc:
@@ -750,10 +915,11 @@ class MigrationValidator:
             mapping = self.es_client.indices.get_mapping(index=es_index)
             es_fields = mapping[es_index]['mappings']['properties']
             
-            # Compare with Oracle schema
-            cursor = self.oracle_conn.cursor()
-            cursor.execute(f"SELECT * FROM ({oracle_query}) WHERE ROWNUM = 1")
-            oracle_types = {desc[0].lower(): desc[1] for desc in cursor.description}
+            # Compare with Oracle schema; parse only (1=0) so the query is
+            # described without being executed
+            with self.oracle_conn.cursor() as cursor:
+                cursor.parse(f"SELECT * FROM ({oracle_query}) WHERE 1 = 0")
+                oracle_types = {desc[0].lower(): desc[1] for desc in cursor.description}
             
             type_matches = 0
             total_fields = len(oracle_types)
@@ -784,8 +950,12 @@ class MigrationValidator:
     def _check_index_health(self, es_index: str) -> Dict:
         """Check Elasticsearch index health"""
         try:
-            health = self.es_client.cluster.health(index=es_index)
-            stats = self.es_client.indices.stats(index=es_index)
+            # Issue both requests concurrently; the probe pays one round-trip
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                health_future = executor.submit(self.es_client.cluster.health, index=es_index)
+                stats_future = executor.submit(self.es_client.indices.stats, index=es_index)
+                health = health_future.result()
+                stats = stats_future.result()
             
             health_score = 100 if health['status'] == 'green' else (50 if health['status'] == 'yellow' else 0)
             
@@ -809,31 +979,54 @@ class MigrationValidator:
     
     def _compare_documents(self, oracle_doc: Dict, es_doc: Dict) -> bool:
         """Compare Oracle and Elasticsearch documents for equality"""
-        # Simple comparison - could be enhanced for complex data types
-        for key, oracle_value in oracle_doc.items():
+        if orjson is not None:
+            # Fast path: serialize both projections in one C-level pass. orjson
+            # renders datetimes like isoformat(), so equal bytes mean equal docs.
+            try:
+                es_projection = {key: es_doc[key] for key in oracle_doc}
+                if (orjson.dumps(oracle_doc, option=orjson.OPT_SORT_KEYS) ==
+                        orjson.dumps(es_projection, option=orjson.OPT_SORT_KEYS)):
+                    return True
+            except (KeyError, TypeError):
+                # Missing key or unsupported type (e.g. Decimal, LOB); fall through
+                pass
+        
+        # Check the fields that mismatch most often first so differing
+        # documents are rejected after one or two comparisons; keys are
+        # produced lazily, so an early mismatch skips building the rest
+        compare_order_set = self._compare_order_set
+        keys = chain(
+            (key for key in self._compare_order if key in oracle_doc),
+            (key for key in oracle_doc if key not in compare_order_set)
+        )
+        
+        for key in keys:
+            oracle_value = oracle_doc[key]
             if key in es_doc:
                 es_value = es_doc[key]
                 
                 # Handle date comparisons
                 if hasattr(oracle_value, 'isoformat') and isinstance(es_value, str):
                     if oracle_value.isoformat() != es_value:
+                        self._record_miss(key)
                         return False
                 elif oracle_value != es_value:
+                    self._record_miss(key)
                     return False
             else:
+                self._record_miss(key)
                 return False
         
         return True
     
+    def _record_miss(self, key: str):
+        """Count a field mismatch, re-ranking fields on a new key or every N misses"""
+        self._field_miss_counts[key] += 1
+        self._misses += 1
+        if key not in self._compare_order_set or self._misses % self.COMPARE_REORDER_INTERVAL == 0:
+            self._compare_order = [key for key, _ in self._field_miss_counts.most_common()]
+            self._compare_order_set = frozenset(self._compare_order)
+    
     def _types_compatible(self, oracle_type, es_type: str) -> bool:
         """Check if Oracle and Elasticsearch types are compatible"""
-        type_mappings = {
-            oracledb.STRING: ['text', 'keyword'],
-            oracledb.NUMBER: ['long', 'integer', 'double', 'float'],
-            oracledb.DATETIME: ['date'],
-            oracledb.CLOB: ['text'],
-            oracledb.BLOB: ['binary']
-        }
-        
-        compatible_es_types = type_mappings.get(oracle_type, [])
-        return es_type in compatible_es_types
\ No newline at end of file
+        return es_type in _COMPATIBLE_ES_TYPES.get(oracle_type, ())
\ No newline at end of file
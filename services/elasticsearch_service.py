@@ -1,9 +1,49 @@
+from contextlib import contextmanager
+from decimal import Decimal
 from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk
+import json
 import logging
+import os
+import threading
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast path
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+def _orjson_default(value):
+    """Serialize types orjson does not handle natively, matching the ES client"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Unable to serialize {value!r} (type: {type(value)})")
+
+def _json_default(value):
+    """Serialize the non-JSON types the ES client's serializer handles"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Unable to serialize {value!r} (type: {type(value)})")
+
+def _encode_source(doc):
+    """Serialize a document source with orjson, falling back to json
+    
+    orjson rejects integers outside the 64-bit range (Oracle NUMBER(38)
+    values arrive as such ints) even with default= set; json handles them.
+    """
+    try:
+        return orjson.dumps(doc, default=_orjson_default)
+    except TypeError:
+        return json.dumps(doc, default=_json_default, separators=(',', ':')).encode()
+
 class ElasticsearchService:
+    # Bulk loads in progress per cluster/index: key -> {'refs', 'tuned', 'original', 'lock'}
+    _bulk_loads = {}
+    _bulk_loads_lock = threading.Lock()
+    
     def __init__(self, connection_config):
         self.config = connection_config
         self.client = None
@@ -25,6 +65,7 @@ class ElasticsearchService:
                     [url],
                     http_auth=auth,
                     verify_certs=self.config.use_ssl,
+                    http_compress=True,
                     connection_class=None
                 )
             except Exception as e:
@@ -135,44 +176,101 @@ class ElasticsearchService:
             logger.error(f"Error indexing document: {str(e)}")
             raise
     
-    def bulk_index(self, index_name, documents):
-        """Bulk index multiple documents"""
-        try:
-            client = self.get_client()
-            
-            # Prepare bulk actions
-            actions = []
-            for doc in documents:
-                action = {
-                    '_index': index_name,
-                    '_source': doc
+    def parallel_bulk_index(self, index_name, documents, chunk_size=1000, thread_count=None, queue_size=4):
+        """Index a stream of documents concurrently, yielding (ok, item) per document"""
+        client = self.get_client()
+        
+        if orjson is not None:
+            # Pre-serialized sources are passed through by the bulk helpers
+            # untouched; the target index then comes from the request URL.
+            # The 7.x chunker encodes each line itself, so it must be a str
+            actions = (_encode_source(doc).decode() for doc in documents)
+        else:
+            actions = ({'_index': index_name, '_source': doc} for doc in documents)
+        
+        return parallel_bulk(
+            client,
+            actions,
+            thread_count=thread_count or os.cpu_count() or 4,
+            chunk_size=chunk_size,
+            max_chunk_bytes=50 * 1024 * 1024,
+            queue_size=queue_size,
+            raise_on_error=False,
+            raise_on_exception=False,
+            index=index_name,
+            request_timeout=60
+        )
+    
+    @contextmanager
+    def bulk_load_context(self, index_name):
+        """Disable refresh and replicas on an index for the duration of a bulk load
+        
+        Concurrent loads into the same index share one tuning: the first to
+        enter snapshots and tunes the settings, the last to leave restores them.
+        """
+        client = self.get_client()
+        key = (self.config.host, self.config.port, index_name)
+        
+        # The class-wide lock only guards the bookkeeping; settings calls run
+        # under the index's own lock so other indices are never held up
+        with self._bulk_loads_lock:
+            load = self._bulk_loads.get(key)
+            if load is None:
+                load = self._bulk_loads[key] = {
+                    'refs': 0, 'tuned': False, 'original': None, 'lock': threading.Lock()
                 }
-                actions.append(action)
-            
-            # Execute bulk request
-            response = client.bulk(body=actions)
+            load['refs'] += 1
+        
+        with load['lock']:
+            if not load['tuned']:
+                load['tuned'] = True
+                load['original'] = self._tune_for_bulk_load(client, index_name)
+        
+        try:
+            yield
+        finally:
+            with self._bulk_loads_lock:
+                load['refs'] -= 1
+                last = load['refs'] == 0
+                if last:
+                    del self._bulk_loads[key]
             
-            # Count successful and failed operations
-            success_count = 0
-            failed_count = 0
-            errors = []
+            if last and load['original'] is not None:
+                with load['lock']:
+                    try:
+                        client.indices.put_settings(index=index_name, body={'index': load['original']})
+                        client.indices.refresh(index=index_name)
+                    except Exception as e:
+                        logger.error(f"Error restoring settings for {index_name}: {str(e)}")
+    
+    def _tune_for_bulk_load(self, client, index_name):
+        """Disable refresh and replicas, returning the settings to restore (or None)"""
+        try:
+            if not client.indices.exists(index=index_name):
+                return None
             
-            for item in response['items']:
-                if 'index' in item:
-                    if item['index']['status'] in [200, 201]:
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                        errors.append(item['index'].get('error', 'Unknown error'))
+            settings = client.indices.get_settings(
+                index=index_name,
+                name='index.refresh_interval,index.number_of_replicas'
+            )
+            index_settings = settings.get(index_name, {}).get('settings', {}).get('index', {})
+            # Already tuned by someone else (e.g. another process):
+            # leave it alone rather than restore -1 as the original
+            if index_settings.get('refresh_interval') == '-1':
+                return None
             
+            client.indices.put_settings(
+                index=index_name,
+                body={'index': {'refresh_interval': '-1', 'number_of_replicas': 0}}
+            )
+            # Missing values mean the cluster default; None resets to it
             return {
-                'success_count': success_count,
-                'failed_count': failed_count,
-                'errors': errors[:10]  # Limit to first 10 errors
+                'refresh_interval': index_settings.get('refresh_interval'),
+                'number_of_replicas': index_settings.get('number_of_replicas')
             }
         except Exception as e:
-            logger.error(f"Error bulk indexing: {str(e)}")
-            raise
+            logger.warning(f"Could not tune {index_name} for bulk load: {str(e)}")
+            return None
     
     def delete_index(self, index_name):
         """Delete an Elasticsearch index"""
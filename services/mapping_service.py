@@ -1,9 +1,42 @@
 import logging
+import re
 from services.oracle_service import OracleService
 from services.elasticsearch_service import ElasticsearchService
 
 logger = logging.getLogger(__name__)
 
+# Dotted field path made of word-character segments, e.g. customer.first_name
+_NESTED_FIELD_RE = re.compile(r'\w+(?:\.\w+)*')
+
+# Elasticsearch property templates keyed by ES type; copied per field
+_FIELD_TEMPLATES = {
+    'date': {'type': 'date', 'format': 'yyyy-MM-dd HH:mm:ss||yyyy-MM-dd||epoch_millis'},
+    'text': {'type': 'text', 'analyzer': 'standard'},
+    'keyword': {'type': 'keyword'},
+    'long': {'type': 'long'},
+    'integer': {'type': 'integer'},
+    'double': {'type': 'double'},
+    'float': {'type': 'float'},
+    'boolean': {'type': 'boolean'},
+    'binary': {'type': 'binary'}
+}
+
+# (predicate(oracle_type, field_name_lower, es_type), rule, description);
+# the first matching entry wins
+_TRANSFORMATION_RULES = [
+    (lambda oracle_type, field_lower, es_type: oracle_type.startswith(('DATE', 'TIMESTAMP')),
+     'FORMAT_DATE', 'Convert Oracle date to ISO format'),
+    (lambda oracle_type, field_lower, es_type: oracle_type.startswith('NUMBER') and es_type in ('float', 'double'),
+     'CAST_FLOAT', 'Cast Oracle NUMBER to float'),
+    (lambda oracle_type, field_lower, es_type: oracle_type in ('VARCHAR2', 'CHAR') and 'name' in field_lower,
+     'TRIM_SPACES', 'Trim leading/trailing spaces')
+]
+
+def _field_properties(es_type):
+    """Return a fresh property dict for the given Elasticsearch type"""
+    template = _FIELD_TEMPLATES.get(es_type)
+    return dict(template) if template else {'type': es_type}
+
 class MappingService:
     def __init__(self, oracle_connection, elasticsearch_connection):
         self.oracle_service = OracleService(oracle_connection)
@@ -49,72 +82,74 @@ class MappingService:
         
         # Create a mapping of ES field names (lowercased) for easier matching
         es_field_map = {field['field_name'].lower(): field for field in es_fields}
+        # Pre-normalize ES names once for similarity matching
+        es_field_names = [(name, name.replace('_', '')) for name in es_field_map]
+        
+        # Hoist lookups used on every column
+        get_es_field = es_field_map.get
+        find_similar_field = self._find_similar_field
+        suggest_es_field_name = self._suggest_es_field_name
+        are_types_compatible = self._are_types_compatible
+        append = suggestions.append
         
         for oracle_col in oracle_columns:
-            oracle_field_name = oracle_col['field'].lower()
+            oracle_field = oracle_col['field']
+            oracle_type = oracle_col['oracle_type']
+            oracle_field_name = oracle_field.lower()
             
-            suggestion = {
-                'oracle_field': oracle_col['field'],
-                'oracle_type': oracle_col['oracle_type'],
-                'suggested_es_field': None,
-                'suggested_es_type': oracle_col['elasticsearch_type'],
-                'confidence': 0,
-                'mapping_type': 'new'  # new, exact_match, similar_match, type_mismatch
-            }
-            
-            # Look for exact match
-            if oracle_field_name in es_field_map:
-                es_field = es_field_map[oracle_field_name]
-                suggestion.update({
-                    'suggested_es_field': es_field['field_name'],
-                    'suggested_es_type': es_field['type'],
-                    'confidence': 100,
-                    'mapping_type': 'exact_match'
-                })
+            # Look for exact match, then similar field names
+            # mapping_type: new, exact_match, similar_match, type_mismatch
+            es_field = get_es_field(oracle_field_name)
+            if es_field is not None:
+                confidence = 100
+                mapping_type = 'exact_match'
             else:
-                # Look for similar field names
-                best_match = self._find_similar_field(oracle_field_name, es_field_map.keys())
+                best_match = find_similar_field(oracle_field_name, es_field_names)
                 if best_match:
                     es_field = es_field_map[best_match]
-                    suggestion.update({
-                        'suggested_es_field': es_field['field_name'],
-                        'suggested_es_type': es_field['type'],
-                        'confidence': 75,
-                        'mapping_type': 'similar_match'
-                    })
-                else:
-                    # Suggest new field name based on naming conventions
-                    suggested_name = self._suggest_es_field_name(oracle_field_name)
-                    suggestion.update({
-                        'suggested_es_field': suggested_name,
-                        'confidence': 50,
-                        'mapping_type': 'new'
-                    })
+                    confidence = 75
+                    mapping_type = 'similar_match'
             
-            # Check type compatibility
-            if (suggestion['suggested_es_field'] and 
-                suggestion['mapping_type'] in ['exact_match', 'similar_match']):
-                if not self._are_types_compatible(oracle_col['oracle_type'], 
-                                               suggestion['suggested_es_type']):
-                    suggestion['mapping_type'] = 'type_mismatch'
-                    suggestion['confidence'] = max(25, suggestion['confidence'] - 50)
+            if es_field is not None:
+                suggested_es_field = es_field['field_name']
+                suggested_es_type = es_field['type']
+                
+                # Check type compatibility
+                if suggested_es_field and not are_types_compatible(oracle_type, suggested_es_type):
+                    mapping_type = 'type_mismatch'
+                    confidence = max(25, confidence - 50)
+            else:
+                # Suggest new field name based on naming conventions
+                suggested_es_field = suggest_es_field_name(oracle_field_name)
+                suggested_es_type = oracle_col['elasticsearch_type']
+                confidence = 50
+                mapping_type = 'new'
             
-            suggestions.append(suggestion)
+            append({
+                'oracle_field': oracle_field,
+                'oracle_type': oracle_type,
+                'suggested_es_field': suggested_es_field,
+                'suggested_es_type': suggested_es_type,
+                'confidence': confidence,
+                'mapping_type': mapping_type
+            })
         
         return suggestions
     
     def _find_similar_field(self, oracle_field, es_field_names):
-        """Find similar field names using simple string matching"""
+        """Find similar field names using simple string matching
+        
+        es_field_names holds (lowercased name, name without underscores) pairs.
+        """
         oracle_field = oracle_field.lower()
+        oracle_compact = oracle_field.replace('_', '')
+        oracle_dotted = oracle_field.replace('_', '.')
         
         # Check for partial matches
-        for es_field in es_field_names:
-            es_field_lower = es_field.lower()
-            
+        for es_field, es_compact in es_field_names:
             # Check if Oracle field is contained in ES field or vice versa
-            if (oracle_field in es_field_lower or es_field_lower in oracle_field or
-                oracle_field.replace('_', '') == es_field_lower.replace('_', '') or
-                oracle_field.replace('_', '.') == es_field_lower):
+            if (oracle_field in es_field or es_field in oracle_field or
+                oracle_compact == es_compact or oracle_dotted == es_field):
                 return es_field
         
         return None
@@ -175,6 +210,8 @@ class MappingService:
     def _generate_elasticsearch_mapping(self, oracle_columns):
         """Generate Elasticsearch mapping from Oracle columns"""
         properties = {}
+        # Dotted prefix -> its 'properties' dict, shared by sibling fields
+        path_cache = {}
         
         for col in oracle_columns:
             field_name = col['field']
@@ -182,17 +219,11 @@ class MappingService:
             
             # Handle nested field names (with dots)
             if '.' in field_name:
-                self._add_nested_field(properties, field_name, es_type)
+                self._add_nested_field(properties, field_name, es_type, path_cache)
             else:
-                properties[field_name] = {'type': es_type}
-                
-                # Add format for date fields
-                if es_type == 'date':
-                    properties[field_name]['format'] = 'yyyy-MM-dd HH:mm:ss||yyyy-MM-dd||epoch_millis'
-                
-                # Add analyzer for text fields
-                elif es_type == 'text':
-                    properties[field_name]['analyzer'] = 'standard'
+                if field_name in properties:
+                    self._drop_cached_paths(path_cache, field_name)
+                properties[field_name] = _field_properties(es_type)
         
         return {
             'mappings': {
@@ -200,24 +231,36 @@ class MappingService:
             }
         }
     
-    def _add_nested_field(self, properties, field_path, field_type):
+    def _add_nested_field(self, properties, field_path, field_type, path_cache=None):
         """Add nested field to properties structure"""
-        parts = field_path.split('.')
-        current = properties
+        if path_cache is None:
+            path_cache = {}
+        
+        prefix, _, leaf = field_path.rpartition('.')
+        current = path_cache.get(prefix)
         
-        for i, part in enumerate(parts):
-            if i == len(parts) - 1:  # Last part - add the actual field
-                current[part] = {'type': field_type}
-                if field_type == 'date':
-                    current[part]['format'] = 'yyyy-MM-dd HH:mm:ss||yyyy-MM-dd||epoch_millis'
-                elif field_type == 'text':
-                    current[part]['analyzer'] = 'standard'
-            else:  # Intermediate part - ensure object structure
+        if current is None:
+            # Walk the prefix once, ensuring object structure and caching each level
+            current = properties
+            walked = ''
+            for part in prefix.split('.'):
                 if part not in current:
                     current[part] = {'type': 'object', 'properties': {}}
                 elif 'properties' not in current[part]:
                     current[part]['properties'] = {}
                 current = current[part]['properties']
+                walked = f"{walked}.{part}" if walked else part
+                path_cache[walked] = current
+        
+        if leaf in current:
+            self._drop_cached_paths(path_cache, field_path)
+        current[leaf] = _field_properties(field_type)
+    
+    def _drop_cached_paths(self, path_cache, field_path):
+        """Forget cached prefixes under a field that is being overwritten"""
+        nested_prefix = f"{field_path}."
+        for key in [key for key in path_cache if key == field_path or key.startswith(nested_prefix)]:
+            del path_cache[key]
     
     def _generate_transformation_rules(self, oracle_columns):
         """Generate transformation rules for data migration"""
@@ -227,28 +270,17 @@ class MappingService:
             oracle_field = col['field']
             oracle_type = col['oracle_type']
             es_type = col['elasticsearch_type']
+            field_lower = oracle_field.lower()
             
             # Generate transformation rules based on type differences
-            if oracle_type.startswith('DATE') or oracle_type.startswith('TIMESTAMP'):
-                transformation_rules.append({
-                    'target': oracle_field,
-                    'rule': 'FORMAT_DATE',
-                    'description': 'Convert Oracle date to ISO format'
-                })
-            
-            elif oracle_type.startswith('NUMBER') and es_type in ['float', 'double']:
-                transformation_rules.append({
-                    'target': oracle_field,
-                    'rule': 'CAST_FLOAT',
-                    'description': 'Cast Oracle NUMBER to float'
-                })
-            
-            elif oracle_type in ['VARCHAR2', 'CHAR'] and 'name' in oracle_field.lower():
-                transformation_rules.append({
-                    'target': oracle_field,
-                    'rule': 'TRIM_SPACES',
-                    'description': 'Trim leading/trailing spaces'
-                })
+            for predicate, rule, description in _TRANSFORMATION_RULES:
+                if predicate(oracle_type, field_lower, es_type):
+                    transformation_rules.append({
+                        'target': oracle_field,
+                        'rule': rule,
+                        'description': description
+                    })
+                    break
         
         return transformation_rules
     
@@ -291,6 +323,4 @@ class MappingService:
     
     def _is_valid_nested_field(self, field_name):
         """Check if nested field name follows valid conventions"""
-        # Basic validation - can be enhanced
-        parts = field_name.split('.')
-        return all(part.isalnum() or '_' in part for part in parts)
+        return _NESTED_FIELD_RE.fullmatch(field_name) is not None
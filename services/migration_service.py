@@ -1,6 +1,12 @@
 import logging
+import os
+import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Callable, Optional
 from datetime import datetime
 from models import MigrationJob, MappingConfiguration
 from services.oracle_service import OracleService
@@ -9,31 +15,167 @@ from app import db
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of the prefetched batch stream
+_END_OF_BATCHES = object()
+# Marks a column value absent from its source row
+_MISSING = object()
+
+def _format_date(value):
+    """Convert Oracle date to ISO format"""
+    if not value:
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def _cast_float(value):
+    """Cast Oracle NUMBER to float, leaving unconvertible values untouched"""
+    if value is None:
+        return value
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return value
+
+def _trim_spaces(value):
+    """Trim leading/trailing spaces from strings"""
+    return value.strip() if isinstance(value, str) else value
+
+# Transformation rule name -> value converter
+_TRANSFORMATIONS = {
+    'FORMAT_DATE': _format_date,
+    'CAST_FLOAT': _cast_float,
+    'TRIM_SPACES': _trim_spaces
+}
+
+def _compose(functions):
+    """Chain converters left to right into a single callable"""
+    if len(functions) == 1:
+        return functions[0]
+    
+    def composed(value):
+        for function in functions:
+            value = function(value)
+        return value
+    return composed
+
+def _compile_flat_transform(plan):
+    """Generate a row transformer for plans with no converters or nested paths
+    
+    Rows carrying every mapped column (the normal case for query results)
+    are built as a single dict literal; rows missing a column fall back to
+    copying only the columns present.
+    """
+    items = ", ".join(f"{path[0]!r}: row[{oracle_field!r}]" for oracle_field, path, _ in plan)
+    lines = [
+        "def transform(row):",
+        "    try:",
+        f"        return {{{items}}}",
+        "    except KeyError:",
+        "        pass",
+        "    out = {}"
+    ]
+    for oracle_field, path, _ in plan:
+        lines.append(f"    value = row.get({oracle_field!r}, _MISSING)")
+        lines.append("    if value is not _MISSING:")
+        lines.append(f"        out[{path[0]!r}] = value")
+    lines.append("    return out")
+    
+    namespace = {'_MISSING': _MISSING}
+    exec(compile("\n".join(lines), '<flat-transform>', 'exec'), namespace)
+    return namespace['transform']
+
+@dataclass(frozen=True)
+class TransformPlan:
+    """Compiled field mappings: (oracle_field, es_path, converter) steps"""
+    steps: list
+    # Specialized row transformer, set when every step is a plain 1:1 copy
+    flat: Optional[Callable[[dict], dict]] = None
+
+@dataclass
+class Backoff:
+    """Exponential pause shared by the bulk result loop and the document producer
+    
+    The result loop records throttled batches; the producer waits out the
+    pause before handing parallel_bulk more documents, so fewer requests
+    are sent while Elasticsearch is rejecting them.
+    """
+    minimum: float
+    maximum: float
+    delay: float = 0.0
+    resume_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    
+    def throttled(self):
+        """Double the pause and start it now; returns the new pause"""
+        with self.lock:
+            self.delay = min(max(self.delay * 2, self.minimum), self.maximum)
+            self.resume_at = time.monotonic() + self.delay
+            return self.delay
+    
+    def relax(self):
+        """Halve the pause after a batch went through unthrottled"""
+        with self.lock:
+            self.delay /= 2
+    
+    def wait(self, stop):
+        """Block until the current pause is over or the job is stopped"""
+        remaining = self.resume_at - time.monotonic()
+        if remaining > 0:
+            stop.wait(remaining)
+
+@dataclass
+class JobState:
+    """Bookkeeping for a running migration job"""
+    thread: threading.Thread
+    stop: threading.Event = field(default_factory=threading.Event)
+
 class MigrationService:
-    def __init__(self):
-        self.running_jobs = {}
-        self.stop_flags = {}
+    # Running jobs shared by every service instance (routes create one per request)
+    _jobs = {}
+    _jobs_lock = threading.Lock()
+    
+    # Individual indexing failures logged per job before going quiet
+    MAX_LOGGED_ERRORS = 10
+    # Oracle batches fetched ahead of the indexer (bounds memory use)
+    PREFETCH_DEPTH = 3
+    # Batches smaller than this are transformed inline rather than split
+    PARALLEL_TRANSFORM_MIN_ROWS = 200
+    # Persist job progress every N batches or T seconds, whichever comes first
+    PROGRESS_COMMIT_BATCHES = 20
+    PROGRESS_COMMIT_SECONDS = 5
+    # Pause bounds (seconds) after a batch Elasticsearch throttled with 429s
+    THROTTLE_BACKOFF_MIN = 0.05
+    THROTTLE_BACKOFF_MAX = 2.0
     
     def start_migration(self, job_id):
         """Start migration job in background thread"""
-        if job_id in self.running_jobs:
-            logger.warning(f"Migration job {job_id} is already running")
-            return
+        with self._jobs_lock:
+            if job_id in self._jobs:
+                logger.warning(f"Migration job {job_id} is already running")
+                return
+            
+            stop = threading.Event()
+            thread = threading.Thread(target=self._execute_migration, args=(job_id, stop))
+            thread.daemon = True
+            self._jobs[job_id] = JobState(thread=thread, stop=stop)
         
-        self.stop_flags[job_id] = False
-        thread = threading.Thread(target=self._execute_migration, args=(job_id,))
-        thread.daemon = True
         thread.start()
-        self.running_jobs[job_id] = thread
     
     def stop_migration(self, job_id):
         """Stop running migration job"""
-        if job_id in self.stop_flags:
-            self.stop_flags[job_id] = True
+        with self._jobs_lock:
+            state = self._jobs.get(job_id)
+        
+        if state:
+            state.stop.set()
             logger.info(f"Stop signal sent for migration job {job_id}")
     
-    def _execute_migration(self, job_id):
+    def _execute_migration(self, job_id, stop=None):
         """Execute the actual data migration"""
+        if stop is None:
+            stop = threading.Event()
+        
         try:
             with db.app.app_context():
                 # Get job and mapping configuration
@@ -51,52 +193,109 @@ class MigrationService:
                 
                 logger.info(f"Starting migration job {job_id}")
                 
-                # Initialize services
-                oracle_service = OracleService(mapping_config.oracle_connection)
+                # Initialize services; the Oracle connection is opened for the load below
                 es_service = ElasticsearchService(mapping_config.elasticsearch_connection)
                 
-                # Get total record count
-                total_records = self._get_total_record_count(oracle_service, mapping_config.oracle_query)
-                job.total_records = total_records
-                db.session.commit()
+                # Count the source rows in the background so a slow COUNT(*)
+                # doesn't hold up the first fetch; the total is filled in once known.
+                # The count runs on its own connection, not the streaming one
+                count_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='record-count')
+                count_future = count_pool.submit(
+                    self._count_with_own_connection,
+                    mapping_config.oracle_connection,
+                    mapping_config.oracle_query
+                )
+                count_pool.shutdown(wait=False)
+                count_recorded = False
                 
-                # Process data in batches
+                # Stream transformed rows into concurrent bulk requests; the
+                # parallel_bulk queue applies backpressure to the Oracle reader
                 batch_size = 1000
                 processed = 0
                 failed = 0
                 
-                for batch in self._get_data_batches(oracle_service, mapping_config.oracle_query, batch_size):
-                    # Check stop flag
-                    if self.stop_flags.get(job_id, False):
-                        job.status = 'stopped'
-                        job.end_time = datetime.utcnow()
-                        db.session.commit()
-                        logger.info(f"Migration job {job_id} stopped by user")
-                        return
-                    
-                    # Transform data according to mappings
-                    transformed_data = self._transform_batch(batch, mapping_config)
-                    
-                    # Index to Elasticsearch
-                    try:
-                        result = es_service.bulk_index(mapping_config.elasticsearch_index, transformed_data)
-                        processed += result['success_count']
-                        failed += result['failed_count']
-                        
-                        if result['errors']:
-                            logger.warning(f"Batch errors in job {job_id}: {result['errors']}")
+                batches_since_commit = 0
+                last_commit = time.monotonic()
+                
+                # Only slow down when Elasticsearch pushes back
+                backoff = Backoff(self.THROTTLE_BACKOFF_MIN, self.THROTTLE_BACKOFF_MAX)
+                throttled = False
+                
+                try:
+                    with OracleService(mapping_config.oracle_connection) as oracle_service, \
+                            es_service.bulk_load_context(mapping_config.elasticsearch_index):
+                        documents = self._generate_documents(
+                            stop, oracle_service, mapping_config, batch_size, backoff
+                        )
                         
-                    except Exception as e:
-                        logger.error(f"Error indexing batch in job {job_id}: {str(e)}")
-                        failed += len(transformed_data)
-                    
-                    # Update progress
+                        for ok, item in es_service.parallel_bulk_index(
+                                mapping_config.elasticsearch_index, documents, chunk_size=batch_size):
+                            if ok:
+                                processed += 1
+                            else:
+                                failed += 1
+                                if item.get('index', {}).get('status') == 429:
+                                    throttled = True
+                                if failed <= self.MAX_LOGGED_ERRORS:
+                                    logger.warning(f"Indexing error in job {job_id}: {item}")
+                            
+                            if (processed + failed) % batch_size:
+                                continue
+                            
+                            # Back off exponentially while bulk requests are rejected.
+                            # The pause is taken by the document producer: parallel_bulk's
+                            # workers keep sending whatever this loop hasn't read yet, so
+                            # only withholding new documents lowers the request rate.
+                            # Rejected documents are counted as failed, not retried
+                            if throttled:
+                                delay = backoff.throttled()
+                                logger.info(f"Elasticsearch throttling job {job_id}, backing off {delay:.2f}s")
+                                throttled = False
+                            else:
+                                backoff.relax()
+                            
+                            # Checkpoint progress every few batches instead of every batch
+                            batches_since_commit += 1
+                            now = time.monotonic()
+                            if (batches_since_commit >= self.PROGRESS_COMMIT_BATCHES or
+                                    now - last_commit >= self.PROGRESS_COMMIT_SECONDS):
+                                if not count_recorded and count_future.done():
+                                    job.total_records = count_future.result()
+                                    count_recorded = True
+                                job.processed_records = processed
+                                job.failed_records = failed
+                                db.session.commit()
+                                batches_since_commit = 0
+                                last_commit = now
+                except Exception:
+                    count_future.cancel()
+                    # Persist the progress made so far before the job is marked failed
                     job.processed_records = processed
                     job.failed_records = failed
                     db.session.commit()
-                    
-                    # Small delay to prevent overwhelming the systems
-                    time.sleep(0.1)
+                    raise
+                
+                job.processed_records = processed
+                job.failed_records = failed
+                
+                # Check stop flag
+                if stop.is_set():
+                    if not count_recorded and count_future.done():
+                        job.total_records = count_future.result()
+                    count_future.cancel()
+                    job.status = 'stopped'
+                    job.end_time = datetime.utcnow()
+                    db.session.commit()
+                    logger.info(f"Migration job {job_id} stopped by user")
+                    return
+                
+                # Every row has been read by now, so a COUNT still in flight is moot
+                if not count_recorded:
+                    if count_future.done():
+                        job.total_records = count_future.result()
+                    else:
+                        count_future.cancel()
+                        job.total_records = processed + failed
                 
                 # Complete the job
                 job.status = 'completed'
@@ -117,10 +316,36 @@ class MigrationService:
         
         finally:
             # Clean up
-            if job_id in self.running_jobs:
-                del self.running_jobs[job_id]
-            if job_id in self.stop_flags:
-                del self.stop_flags[job_id]
+            with self._jobs_lock:
+                self._jobs.pop(job_id, None)
+    
+    def _generate_documents(self, stop, oracle_service, mapping_config, batch_size, backoff=None):
+        """Yield a transformed document for each Oracle row until stopped
+        
+        Each batch is held back while backoff reports Elasticsearch throttling.
+        """
+        plan = self._compile_plan(mapping_config)
+        workers = os.cpu_count() or 4
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transform') as transform_pool:
+            for batch in self._prefetch_batches(oracle_service, mapping_config.oracle_query, batch_size):
+                if backoff is not None:
+                    backoff.wait(stop)
+                if stop.is_set():
+                    return
+                
+                # Transform data according to mappings; the plan is immutable
+                # so contiguous slices of the batch can be converted in parallel
+                if len(batch) < self.PARALLEL_TRANSFORM_MIN_ROWS:
+                    transformed = self._transform_batch(batch, mapping_config, plan)
+                else:
+                    chunk_size = -(-len(batch) // workers)
+                    chunks = [batch[i:i + chunk_size] for i in range(0, len(batch), chunk_size)]
+                    transformed = chain.from_iterable(transform_pool.map(
+                        lambda chunk: self._transform_batch(chunk, mapping_config, plan), chunks
+                    ))
+                
+                yield from transformed
     
     def _get_total_record_count(self, oracle_service, query):
         """Get total number of records that will be migrated"""
@@ -132,114 +357,136 @@ class MigrationService:
             logger.error(f"Error getting record count: {str(e)}")
             return 0
     
+    def _count_with_own_connection(self, oracle_connection, query):
+        """Get the record count over a dedicated connection, closed when done"""
+        with OracleService(oracle_connection) as count_service:
+            return self._get_total_record_count(count_service, query)
+    
     def _get_data_batches(self, oracle_service, query, batch_size):
         """Generator that yields data in batches"""
-        offset = 0
+        # Execute the query once and stream it, rather than re-running a
+        # ROWNUM-paginated query per batch
+        try:
+            yield from oracle_service.stream_query(query, batch_size)
+        except Exception as e:
+            logger.error(f"Error streaming batches: {str(e)}")
+    
+    def _prefetch_batches(self, oracle_service, query, batch_size):
+        """Yield data batches fetched on a background thread, up to PREFETCH_DEPTH ahead"""
+        batches = queue.Queue(maxsize=self.PREFETCH_DEPTH)
+        cancelled = threading.Event()
         
-        while True:
-            # Oracle uses ROWNUM for pagination
-            paginated_query = f"""
-                SELECT * FROM (
-                    SELECT rownum rn, t.* FROM ({query}) t
-                ) WHERE rn > {offset} AND rn <= {offset + batch_size}
-            """
-            
+        def put(item):
+            # Block while the queue is full, but give up once the consumer is gone
+            while not cancelled.is_set():
+                try:
+                    batches.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def fetch():
             try:
-                result = oracle_service.execute_query(paginated_query, limit=batch_size + 1)
-                
-                if not result['rows']:
-                    break
-                
-                # Remove the rownum column
-                batch_data = []
-                for row in result['rows']:
-                    if 'RN' in row:
-                        del row['RN']
-                    batch_data.append(row)
-                
-                yield batch_data
-                
-                if len(batch_data) < batch_size:
+                for batch in self._get_data_batches(oracle_service, query, batch_size):
+                    if not put(batch):
+                        return
+            finally:
+                put(_END_OF_BATCHES)
+        
+        fetcher = threading.Thread(target=fetch, daemon=True)
+        fetcher.start()
+        
+        try:
+            while True:
+                batch = batches.get()
+                if batch is _END_OF_BATCHES:
                     break
-                
-                offset += batch_size
-                
-            except Exception as e:
-                logger.error(f"Error fetching batch at offset {offset}: {str(e)}")
-                break
+                yield batch
+        finally:
+            cancelled.set()
     
-    def _transform_batch(self, batch_data, mapping_config):
-        """Transform batch data according to field mappings"""
-        field_mappings = mapping_config.get_field_mappings()
-        transformation_rules = mapping_config.get_transformation_rules()
+    def _compile_plan(self, mapping_config):
+        """Compile field mappings into (oracle_field, es_path, converter) steps
         
-        transformed_batch = []
+        Rules targeting a field are folded into one converter (None when the
+        value is copied as is) and ES field paths are split once up front.
+        Plans that only copy columns to top-level fields also get a generated
+        row transformer.
+        """
+        transformation_rules = mapping_config.get_transformation_rules()
+        plan = []
         
-        for row in batch_data:
-            transformed_row = {}
-            
-            # Apply field mappings
-            for mapping in field_mappings:
-                oracle_field = mapping.get('oracle_field')
-                es_field = mapping.get('es_field')
-                
-                if oracle_field in row and es_field:
-                    value = row[oracle_field]
-                    
-                    # Apply transformations
-                    for rule in transformation_rules:
-                        if rule.get('target') == oracle_field:
-                            value = self._apply_transformation(value, rule)
-                    
-                    # Handle nested field assignment
-                    self._set_nested_value(transformed_row, es_field, value)
+        for mapping in mapping_config.get_field_mappings():
+            oracle_field = mapping.get('oracle_field')
+            es_field = mapping.get('es_field')
+            if not es_field:
+                continue
             
-            transformed_batch.append(transformed_row)
+            converters = [
+                _TRANSFORMATIONS[rule.get('rule')]
+                for rule in transformation_rules
+                if rule.get('target') == oracle_field and rule.get('rule') in _TRANSFORMATIONS
+            ]
+            converter = _compose(converters) if converters else None
+            plan.append((oracle_field, tuple(es_field.split('.')), converter))
         
-        return transformed_batch
+        if all(converter is None and len(path) == 1 for _, path, converter in plan):
+            return TransformPlan(plan, _compile_flat_transform(plan))
+        return TransformPlan(plan)
     
-    def _apply_transformation(self, value, rule):
-        """Apply transformation rule to a value"""
-        rule_type = rule.get('rule')
+    def _transform_batch(self, batch_data, mapping_config, plan=None):
+        """Transform batch data according to field mappings"""
+        if plan is None:
+            plan = self._compile_plan(mapping_config)
         
-        if rule_type == 'FORMAT_DATE' and value:
-            # Convert Oracle date to ISO format
-            if hasattr(value, 'isoformat'):
-                return value.isoformat()
-            return str(value)
+        if plan.flat is not None:
+            return [plan.flat(row) for row in batch_data]
         
-        elif rule_type == 'CAST_FLOAT' and value is not None:
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return value
+        # Work column by column: pull each mapped Oracle column out of the
+        # batch, convert it in one pass, then scatter it into the documents
+        transformed_batch = [{} for _ in batch_data]
         
-        elif rule_type == 'TRIM_SPACES' and isinstance(value, str):
-            return value.strip()
+        for oracle_field, path, converter in plan.steps:
+            column = [row.get(oracle_field, _MISSING) for row in batch_data]
+            if converter is not None:
+                column = [value if value is _MISSING else converter(value) for value in column]
+            
+            if len(path) == 1:
+                key = path[0]
+                for transformed_row, value in zip(transformed_batch, column):
+                    if value is not _MISSING:
+                        transformed_row[key] = value
+            else:
+                # Handle nested field assignment
+                for transformed_row, value in zip(transformed_batch, column):
+                    if value is not _MISSING:
+                        self._set_path(transformed_row, path, value)
         
-        return value
+        return transformed_batch
     
-    def _set_nested_value(self, obj, path, value):
-        """Set value in nested object using dot notation"""
-        parts = path.split('.')
-        current = obj
+    def _apply_transformation(self, value, rule):
+        """Apply transformation rule to a value"""
+        transformation = _TRANSFORMATIONS.get(rule.get('rule'))
+        return transformation(value) if transformation else value
+    
+    def _set_path(self, obj, path, value):
+        """Set value in nested object using a pre-split path tuple"""
+        if len(path) == 1:
+            obj[path[0]] = value
+            return
         
-        for i, part in enumerate(parts):
-            if i == len(parts) - 1:  # Last part
-                current[part] = value
-            else:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
+        current = obj
+        for part in path[:-1]:
+            current = current.setdefault(part, {})
+        current[path[-1]] = value
     
     def preview_migration(self, mapping_config, limit=5):
         """Preview migration results with sample data"""
         try:
-            # Initialize services
-            oracle_service = OracleService(mapping_config.oracle_connection)
-            
             # Get sample data
-            sample_data = oracle_service.execute_query(mapping_config.oracle_query, limit)
+            with OracleService(mapping_config.oracle_connection) as oracle_service:
+                sample_data = oracle_service.execute_query(mapping_config.oracle_query, limit)
             
             # Transform sample data
             transformed_data = self._transform_batch(sample_data['rows'], mapping_config)
@@ -3,15 +3,172 @@ Oracle Database Service
 Handles Oracle database connections and operations
 """
 
+import copy
+import hashlib
 import logging
+import re
 import sqlparse
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain, islice
+from sqlparse.sql import Identifier, IdentifierList, Parenthesis
+from sqlparse.tokens import Name
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Known join shapes recognized by the mock join analysis, by group name
+_KNOWN_JOINS = {
+    'customers': {
+        'type': 'INNER',
+        'left_table': 'ORDERS',
+        'right_table': 'CUSTOMERS',
+        'left_field': 'CUSTOMER_ID',
+        'right_field': 'ID'
+    },
+    'order_items': {
+        'type': 'INNER',
+        'left_table': 'ORDERS',
+        'right_table': 'ORDER_ITEMS',
+        'left_field': 'ORDER_ID',
+        'right_field': 'ORDER_ID'
+    },
+    'products': {
+        'type': 'INNER',
+        'left_table': 'ORDER_ITEMS',
+        'right_table': 'PRODUCTS',
+        'left_field': 'PRODUCT_ID',
+        'right_field': 'ID'
+    }
+}
+# All known join shapes in one pattern; the named group that matched
+# identifies the join
+_JOINS_RE = re.compile(
+    r'(?P<customers>customers\s+c\s+ON\s+o\.customer_id\s*=\s*c\.id)'
+    r'|(?P<order_items>order_items\s+oi\s+ON\s+o\.order_id\s*=\s*oi\.order_id)'
+    r'|(?P<products>products\s+p\s+ON\s+oi\.product_id\s*=\s*p\.id)',
+    re.IGNORECASE
+)
+
+# Table name (schema prefix dropped) following FROM/JOIN; names passed to a
+# function, as in EXTRACT(YEAR FROM d), are not tables
+_TABLE_RE = re.compile(
+    r'\b(?:FROM|JOIN)\s+(?:[A-Za-z_][\w$#]*\.)?([A-Za-z_][\w$#]*)(?![\w$#.]|\s*\))',
+    re.IGNORECASE
+)
+# Subqueries/unions, comma-separated FROM lists, quotes and comments need
+# sqlparse's grouping rather than the regex scan
+_NEEDS_PARSER_RE = re.compile(
+    r"\bSELECT\b.*\bSELECT\b|\bFROM\s+[\w$#.]+(?:\s+(?:AS\s+)?\w+)?\s*,|['\"]|--|/\*",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Oracle type substring -> Elasticsearch type, first match wins; anything
+# else maps to text
+_ES_TYPE_BY_SUBSTRING = (
+    ('NUMBER', 'integer'),
+    ('DATE', 'date'),
+    ('TIMESTAMP', 'date')
+)
+# Any JOIN keyword, found without upper-casing a copy of the query
+_JOIN_KEYWORD_RE = re.compile(r'JOIN', re.IGNORECASE)
+
+# Quoted text, comments, parentheses and the top-level keywords that end a
+# FROM clause (group 1)
+_CLAUSE_TOKEN_RE = re.compile(
+    r"'(?:[^']|'')*'|\"[^\"]*\"|--[^\n]*|/\*.*?\*/|[()]"
+    r"|\b(FROM|WHERE|GROUP|ORDER|HAVING|UNION|INTERSECT|MINUS)\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Mock table kinds: exact names first, then the first marker contained in the name
+_TABLE_KINDS = {
+    'ORDERS': 'ORDER',
+    'ORDER_ITEMS': 'ORDER',
+    'CUSTOMERS': 'CUSTOMER',
+    'ITEMS': 'ITEM',
+    'PRODUCTS': 'PRODUCT'
+}
+_TABLE_KIND_MARKERS = ('ORDER', 'CUSTOMER', 'ITEM', 'PRODUCT')
+
+# Mock columns by table kind as (name, type) pairs; dicts are built per table
+_MOCK_TABLE_FIELDS = {
+    'ORDER': (
+        ('ORDER_ID', 'NUMBER'),
+        ('ORDER_DATE', 'DATE'),
+        ('CUSTOMER_ID', 'NUMBER'),
+        ('TOTAL_AMOUNT', 'NUMBER(10,2)'),
+        ('STATUS', 'VARCHAR2(50)')
+    ),
+    'CUSTOMER': (
+        ('ID', 'NUMBER'),
+        ('CUSTOMER_NAME', 'VARCHAR2(100)'),
+        ('EMAIL', 'VARCHAR2(255)'),
+        ('PHONE', 'VARCHAR2(20)'),
+        ('ADDRESS', 'VARCHAR2(500)')
+    ),
+    'ITEM': (
+        ('ID', 'NUMBER'),
+        ('ORDER_ID', 'NUMBER'),
+        ('PRODUCT_ID', 'NUMBER'),
+        ('QUANTITY', 'NUMBER'),
+        ('UNIT_PRICE', 'NUMBER(10,2)')
+    ),
+    'PRODUCT': (
+        ('ID', 'NUMBER'),
+        ('PRODUCT_NAME', 'VARCHAR2(100)'),
+        ('CATEGORY', 'VARCHAR2(50)'),
+        ('DESCRIPTION', 'CLOB'),
+        ('PRICE', 'NUMBER(10,2)')
+    ),
+    # Generic fields
+    'GENERIC': (
+        ('ID', 'NUMBER'),
+        ('NAME', 'VARCHAR2(100)'),
+        ('CREATED_DATE', 'DATE'),
+        ('UPDATED_DATE', 'DATE')
+    )
+}
+
+# Mock foreign keys by the kind of table that holds them
+_MOCK_FOREIGN_KEYS = {
+    'ORDER': (
+        {'field': 'CUSTOMER_ID', 'references_table': 'CUSTOMERS', 'references_field': 'ID'},
+    ),
+    'ITEM': (
+        {'field': 'ORDER_ID', 'references_table': 'ORDERS', 'references_field': 'ORDER_ID'},
+        {'field': 'PRODUCT_ID', 'references_table': 'PRODUCTS', 'references_field': 'ID'}
+    )
+}
+
+def _classify_table(table_name_upper: str) -> str:
+    """Return the mock table kind: exact names first, then the first marker in the name"""
+    kind = _TABLE_KINDS.get(table_name_upper)
+    if kind is None:
+        kind = next((marker for marker in _TABLE_KIND_MARKERS if marker in table_name_upper), 'GENERIC')
+    return kind
+
+# Query analyses shared by every service instance, keyed by a digest of the
+# exact query text (least recently used evicted)
+_ANALYSIS_CACHE = OrderedDict()
+_ANALYSIS_CACHE_LOCK = threading.Lock()
+_ANALYSIS_CACHE_SIZE = 256
+
+@lru_cache(maxsize=1024)
+def _mock_table_fields(table_name_upper: str) -> Tuple[Dict, ...]:
+    """Build (once per table name) the shared, read-only mock fields of a table"""
+    return tuple(
+        {'name': name, 'type': data_type, 'table': table_name_upper}
+        for name, data_type in _MOCK_TABLE_FIELDS[_classify_table(table_name_upper)]
+    )
+
 class OracleService:
     """Service for Oracle database operations"""
     
+    # Rows pulled per network round-trip when streaming
+    DEFAULT_ARRAYSIZE = 1024
+    
     def __init__(self, oracle_connection):
         self.connection_config = oracle_connection
         self._connection = None
@@ -49,16 +206,16 @@ class OracleService:
             if not self._connection:
                 self.connect()
 
-            fields = self._get_mock_table_fields(table_name)
+            columns = _MOCK_TABLE_FIELDS[_classify_table(table_name.upper())]
             return [
                 {
-                    'column_name': field['name'],
-                    'data_type': field['type'],
+                    'column_name': name,
+                    'data_type': data_type,
                     'data_length': None,
                     'nullable': True,
-                    'elasticsearch_type': self._map_oracle_to_es(field['type'])
+                    'elasticsearch_type': self._map_oracle_to_es(data_type)
                 }
-                for field in fields
+                for name, data_type in columns
             ]
         except Exception as e:
             logger.error(f"Error fetching columns for {table_name}: {e}")
@@ -67,21 +224,34 @@ class OracleService:
     def _map_oracle_to_es(self, oracle_type: str) -> str:
         """Map Oracle data types to Elasticsearch types"""
         oracle_type = oracle_type.upper()
-        if 'NUMBER' in oracle_type:
-            return 'integer'
-        if 'DATE' in oracle_type or 'TIMESTAMP' in oracle_type:
-            return 'date'
+        for marker, es_type in _ES_TYPE_BY_SUBSTRING:
+            if marker in oracle_type:
+                return es_type
         return 'text'
     
     def analyze_query(self, query: str) -> Dict[str, Any]:
         """Analyze Oracle query and extract metadata"""
+        # Hand out copies so callers can't alter the cached analysis
+        return copy.deepcopy(self._analyze(query))
+    
+    def _analyze(self, query: str) -> Dict[str, Any]:
+        """Return the shared, read-only analysis of a query"""
+        # Parse each distinct query once per process; routes and jobs build a
+        # fresh service each time. The exact text is hashed: collapsing
+        # whitespace would let a newline-terminated -- comment and its
+        # one-line copy share an entry
+        cache_key = hashlib.blake2b(query.encode(), digest_size=16).digest()
+        with _ANALYSIS_CACHE_LOCK:
+            cached = _ANALYSIS_CACHE.get(cache_key)
+            if cached is not None:
+                _ANALYSIS_CACHE.move_to_end(cache_key)
+                return cached
+        
         try:
-            # Parse the SQL query
-            parsed = sqlparse.parse(query)[0]
-            
             # Extract tables, fields, and joins
             analysis = {
                 'fields': [],
+                'columns': [],
                 'tables': [],
                 'joins': [],
                 'where_conditions': [],
@@ -89,47 +259,47 @@ class OracleService:
                 'group_by': []
             }
             
-            # Basic query analysis using sqlparse
-            tokens = list(parsed.flatten())
+            # Simple queries are scanned with one regex pass; anything else is
+            # parsed. Either way names come back upper-cased for the mock lookups
+            if _NEEDS_PARSER_RE.search(query):
+                table_names = self._parse_tables(query)
+            else:
+                table_names = self._scan_tables(query)
             
-            # Extract table names and aliases
-            in_from = False
-            in_join = False
-            current_table = None
+            analysis['tables'] = table_names
             
-            for i, token in enumerate(tokens):
-                token_str = str(token).strip().upper()
-                
-                if token_str == 'FROM':
-                    in_from = True
-                    continue
-                elif token_str in ['JOIN', 'INNER JOIN', 'LEFT JOIN', 'RIGHT JOIN', 'FULL JOIN']:
-                    in_join = True
-                    continue
-                elif token_str in ['WHERE', 'ORDER BY', 'GROUP BY', 'HAVING']:
-                    in_from = False
-                    in_join = False
-                    continue
-                
-                if in_from or in_join:
-                    if token.ttype is None and token_str not in ['ON', ',']:
-                        if token_str not in analysis['tables']:
-                            analysis['tables'].append(token_str)
-                            
-                            # Mock field analysis
-                            mock_fields = self._get_mock_table_fields(token_str)
-                            analysis['fields'].extend(mock_fields)
+            # Mock field analysis, assembled into one list in a single pass
+            analysis['fields'] = list(chain.from_iterable(
+                self._get_mock_table_fields(table_name) for table_name in table_names
+            ))
+            
+            # Result columns as the mapping screens consume them, built in one pass
+            map_oracle_to_es = self._map_oracle_to_es
+            analysis['columns'] = [
+                {
+                    'field': field['name'],
+                    'oracle_type': field['type'],
+                    'elasticsearch_type': map_oracle_to_es(field['type']),
+                    'source': f"query.{field['name']}"
+                }
+                for field in analysis['fields']
+            ]
             
             # Mock join analysis
-            if 'JOIN' in query.upper():
+            if _JOIN_KEYWORD_RE.search(query):
                 analysis['joins'] = self._analyze_joins(query)
             
+            with _ANALYSIS_CACHE_LOCK:
+                _ANALYSIS_CACHE[cache_key] = analysis
+                if len(_ANALYSIS_CACHE) > _ANALYSIS_CACHE_SIZE:
+                    _ANALYSIS_CACHE.popitem(last=False)
             return analysis
             
         except Exception as e:
             logger.error(f"Error analyzing query: {e}")
             return {
                 'fields': [],
+                'columns': [],
                 'tables': [],
                 'joins': [],
                 'where_conditions': [],
@@ -137,95 +307,114 @@ class OracleService:
                 'group_by': []
             }
     
-    def _get_mock_table_fields(self, table_name: str) -> List[Dict]:
-        """Get mock field information for a table"""
-        table_name = table_name.upper()
+    def _scan_tables(self, query: str) -> List[str]:
+        """Return the distinct, upper-cased table names following FROM/JOIN in a simple query"""
+        return list(dict.fromkeys(match.group(1).upper() for match in _TABLE_RE.finditer(query)))
+    
+    def _parse_tables(self, query: str) -> List[str]:
+        """Return the distinct, upper-cased table names of a query using sqlparse
         
-        # Mock field data based on common table patterns
-        if 'ORDER' in table_name:
-            return [
-                {'name': 'ORDER_ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'ORDER_DATE', 'type': 'DATE', 'table': table_name},
-                {'name': 'CUSTOMER_ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'TOTAL_AMOUNT', 'type': 'NUMBER(10,2)', 'table': table_name},
-                {'name': 'STATUS', 'type': 'VARCHAR2(50)', 'table': table_name}
-            ]
-        elif 'CUSTOMER' in table_name:
-            return [
-                {'name': 'ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'CUSTOMER_NAME', 'type': 'VARCHAR2(100)', 'table': table_name},
-                {'name': 'EMAIL', 'type': 'VARCHAR2(255)', 'table': table_name},
-                {'name': 'PHONE', 'type': 'VARCHAR2(20)', 'table': table_name},
-                {'name': 'ADDRESS', 'type': 'VARCHAR2(500)', 'table': table_name}
-            ]
-        elif 'ITEM' in table_name:
-            return [
-                {'name': 'ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'ORDER_ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'PRODUCT_ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'QUANTITY', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'UNIT_PRICE', 'type': 'NUMBER(10,2)', 'table': table_name}
-            ]
-        elif 'PRODUCT' in table_name:
-            return [
-                {'name': 'ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'PRODUCT_NAME', 'type': 'VARCHAR2(100)', 'table': table_name},
-                {'name': 'CATEGORY', 'type': 'VARCHAR2(50)', 'table': table_name},
-                {'name': 'DESCRIPTION', 'type': 'CLOB', 'table': table_name},
-                {'name': 'PRICE', 'type': 'NUMBER(10,2)', 'table': table_name}
-            ]
-        else:
-            # Generic fields
-            return [
-                {'name': 'ID', 'type': 'NUMBER', 'table': table_name},
-                {'name': 'NAME', 'type': 'VARCHAR2(100)', 'table': table_name},
-                {'name': 'CREATED_DATE', 'type': 'DATE', 'table': table_name},
-                {'name': 'UPDATED_DATE', 'type': 'DATE', 'table': table_name}
-            ]
+        Only the top-level FROM clauses are parsed; select lists and filters
+        (wide column lists, long IN lists) never reach the tokenizer.
+        """
+        tables = chain.from_iterable(
+            self._extract_tables(sqlparse.parse(clause)[0]) for clause in self._from_clauses(query)
+        )
+        return list(dict.fromkeys(tables))
     
-    def _analyze_joins(self, query: str) -> List[Dict]:
-        """Analyze JOIN clauses in the query"""
-        joins = []
+    def _from_clauses(self, query: str) -> List[str]:
+        """Slice out each top-level "FROM ..." clause, up to the keyword that ends it"""
+        clauses = []
+        depth = 0
+        start = None
         
-        # Mock join analysis - in production would use proper SQL parsing
-        if 'customers c ON o.customer_id = c.id' in query.lower():
-            joins.append({
-                'type': 'INNER',
-                'left_table': 'ORDERS',
-                'right_table': 'CUSTOMERS',
-                'left_field': 'CUSTOMER_ID',
-                'right_field': 'ID'
-            })
+        for match in _CLAUSE_TOKEN_RE.finditer(query):
+            token = match.group()
+            if token == '(':
+                depth += 1
+            elif token == ')':
+                depth -= 1
+            elif depth == 0 and match.group(1):
+                if start is not None:
+                    clauses.append(query[start:match.start()])
+                    start = None
+                if match.group(1).upper() == 'FROM':
+                    start = match.start()
         
-        if 'order_items oi ON o.order_id = oi.order_id' in query.lower():
-            joins.append({
-                'type': 'INNER',
-                'left_table': 'ORDERS',
-                'right_table': 'ORDER_ITEMS',
-                'left_field': 'ORDER_ID',
-                'right_field': 'ORDER_ID'
-            })
+        if start is not None:
+            clauses.append(query[start:])
+        return clauses
+    
+    def _extract_tables(self, parsed) -> List[str]:
+        """Return the distinct, upper-cased table names referenced in FROM/JOIN clauses
+        
+        Walks the top-level grouped statement: sqlparse already groups
+        "orders o" / "a, b" into Identifier(List) nodes after FROM/JOIN.
+        """
+        tables = []
+        seen = set()
+        expect_table = False
+        
+        for token in parsed.tokens:
+            if token.is_whitespace:
+                continue
+            
+            if token.is_keyword:
+                keyword = token.normalized
+                expect_table = keyword == 'FROM' or keyword.endswith('JOIN')
+                continue
+            
+            if not expect_table:
+                continue
+            expect_table = False
+            
+            if isinstance(token, IdentifierList):
+                candidates = token.get_identifiers()
+            else:
+                candidates = [token]
+            
+            for candidate in candidates:
+                if isinstance(candidate, Identifier):
+                    # Skip inline views such as "(SELECT ...) t"
+                    if isinstance(candidate.token_first(), Parenthesis):
+                        continue
+                    table_name = candidate.get_real_name()
+                elif candidate.ttype in Name:
+                    table_name = candidate.value
+                else:
+                    continue
+                
+                table_name = table_name.upper()
+                if table_name not in seen:
+                    seen.add(table_name)
+                    tables.append(table_name)
         
-        if 'products p ON oi.product_id = p.id' in query.lower():
-            joins.append({
-                'type': 'INNER',
-                'left_table': 'ORDER_ITEMS',
-                'right_table': 'PRODUCTS',
-                'left_field': 'PRODUCT_ID',
-                'right_field': 'ID'
-            })
+        return tables
+    
+    def _get_mock_table_fields(self, table_name_upper: str) -> Tuple[Dict, ...]:
+        """Get mock field information for an already upper-cased table name
         
-        return joins
+        The result is cached and shared between callers; copy before mutating.
+        """
+        # Mock field data based on common table patterns
+        return _mock_table_fields(table_name_upper)
+    
+    def _analyze_joins(self, query: str) -> List[Dict]:
+        """Analyze JOIN clauses in the query"""
+        # Mock join analysis - in production would use proper SQL parsing
+        found = {match.lastgroup for match in _JOINS_RE.finditer(query)}
+        return [dict(join) for name, join in _KNOWN_JOINS.items() if name in found]
     
     def get_table_schema(self, table_name: str) -> Dict:
         """Get schema information for a table"""
         try:
             # Mock schema information
+            table_name_upper = table_name.upper()
             return {
                 'table_name': table_name,
-                'fields': self._get_mock_table_fields(table_name),
+                'fields': self._get_mock_table_fields(table_name_upper),
                 'primary_keys': ['ID'],
-                'foreign_keys': self._get_mock_foreign_keys(table_name),
+                'foreign_keys': self._get_mock_foreign_keys(table_name_upper),
                 'indexes': []
             }
             
@@ -233,61 +422,89 @@ class OracleService:
             logger.error(f"Error getting table schema: {e}")
             return {'table_name': table_name, 'fields': [], 'primary_keys': [], 'foreign_keys': [], 'indexes': []}
     
-    def _get_mock_foreign_keys(self, table_name: str) -> List[Dict]:
-        """Get mock foreign key information"""
-        table_name = table_name.upper()
-        
-        if 'ORDER' in table_name and 'ITEM' not in table_name:
-            return [
-                {'field': 'CUSTOMER_ID', 'references_table': 'CUSTOMERS', 'references_field': 'ID'}
-            ]
-        elif 'ITEM' in table_name:
-            return [
-                {'field': 'ORDER_ID', 'references_table': 'ORDERS', 'references_field': 'ORDER_ID'},
-                {'field': 'PRODUCT_ID', 'references_table': 'PRODUCTS', 'references_field': 'ID'}
-            ]
-        
-        return []
+    def _get_mock_foreign_keys(self, table_name_upper: str) -> Tuple[Dict, ...]:
+        """Get mock foreign key information for an already upper-cased table name"""
+        if 'ITEM' in table_name_upper:
+            return _MOCK_FOREIGN_KEYS['ITEM']
+        if 'ORDER' in table_name_upper:
+            return _MOCK_FOREIGN_KEYS['ORDER']
+        return ()
     
     def execute_query(self, query: str, limit: int = 1000) -> List[Dict]:
         """Execute query and return results"""
         try:
-            if not self._connection:
-                self.connect()
-            
-            # Mock query execution
-            logger.info(f"Executing Oracle query: {query[:100]}...")
-            
-            # Return mock data based on query analysis
-            analysis = self.analyze_query(query)
-            mock_data = []
-            
-            for i in range(min(10, limit)):  # Return up to 10 mock records
-                record = {}
-                for field in analysis['fields']:
-                    record[field['name']] = self._generate_mock_value(field['type'], i)
-                mock_data.append(record)
-            
-            return mock_data
+            return list(self.iter_execute_query(query, limit))
             
         except Exception as e:
             logger.error(f"Error executing query: {e}")
             return []
     
-    def _generate_mock_value(self, data_type: str, index: int = 0):
-        """Generate mock value based on data type"""
+    def iter_execute_query(self, query: str, limit: Optional[int] = None,
+                           arraysize: Optional[int] = None) -> Iterator[Dict]:
+        """Execute query and yield up to limit result rows as they are fetched
+        
+        arraysize is the number of rows fetched per round-trip (prefetchrows
+        is arraysize + 1); it defaults to limit, capped at DEFAULT_ARRAYSIZE,
+        so small queries complete in a single round-trip.
+        """
+        if not self._connection:
+            self.connect()
+        
+        if not arraysize:
+            arraysize = min(limit, self.DEFAULT_ARRAYSIZE) if limit else self.DEFAULT_ARRAYSIZE
+        
+        # Mock query execution - a real cursor would set arraysize and
+        # prefetchrows before execute, then iterate the cursor until limit
+        logger.info(f"Executing Oracle query: {query[:100]}... arraysize={arraysize}")
+        
+        # Return mock data based on query analysis (only read, so not copied)
+        analysis = self._analyze(query)
+        row_count = 10 if limit is None else min(10, limit)  # Return up to 10 mock records
+        
+        # Build each column in one pass, then zip the columns into rows
+        names = [field['name'] for field in analysis['fields']]
+        columns = [self._generate_mock_column(field['type'], row_count) for field in analysis['fields']]
+        if not columns:
+            for _ in range(row_count):
+                yield {}
+            return
+        
+        for values in zip(*columns):
+            yield dict(zip(names, values))
+    
+    def stream_query(self, query: str, batch_size: int = 1000,
+                     arraysize: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Execute query once and yield its rows in batches of batch_size
+        
+        arraysize is the number of rows the driver fetches per round-trip
+        (prefetchrows is arraysize + 1 so the first fetch rides on execute);
+        it defaults to at least batch_size so each batch needs one round-trip.
+        """
+        arraysize = arraysize or max(batch_size, self.DEFAULT_ARRAYSIZE)
+        logger.info(f"Streaming Oracle query with arraysize={arraysize}, prefetchrows={arraysize + 1}")
+        
+        # Only one batch is held at a time; rows are pulled from the cursor as needed
+        rows = self.iter_execute_query(query, arraysize=arraysize)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+    
+    def _generate_mock_column(self, data_type: str, count: int) -> List[Any]:
+        """Generate count mock values for a column of the given data type"""
         data_type = data_type.upper()
         
         if 'NUMBER' in data_type:
-            return index + 1
+            return list(range(1, count + 1))
         elif 'VARCHAR2' in data_type or 'VARCHAR' in data_type:
-            return f"Sample Text {index + 1}"
+            return [f"Sample Text {i + 1}" for i in range(count)]
         elif 'DATE' in data_type or 'TIMESTAMP' in data_type:
-            return f"2024-01-{(index % 28) + 1:02d}"
+            return [f"2024-01-{(i % 28) + 1:02d}" for i in range(count)]
         elif 'CLOB' in data_type:
-            return f"Large text content for record {index + 1}"
+            return [f"Large text content for record {i + 1}" for i in range(count)]
         else:
-            return f"Value {index + 1}"
+            return [f"Value {i + 1}" for i in range(count)]
     
     def test_connection(self) -> Dict[str, Any]:
         """Test Oracle database connection"""
@@ -318,8 +535,21 @@ class OracleService:
     def close(self):
         """Close Oracle connection"""
         try:
-            if self._connection:
-                self._connection = None
+            # Detach first so a failing close can't leave a half-closed
+            # connection behind for the next call to reuse
+            connection, self._connection = self._connection, None
+            if connection:
+                # The mock connection is a placeholder; a driver connection
+                # must be closed to release its server session
+                if hasattr(connection, 'close'):
+                    connection.close()
                 logger.info("Oracle connection closed")
         except Exception as e:
             logger.error(f"Error closing Oracle connection: {e}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,45 @@
+import json
+import unittest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from services.elasticsearch_service import ElasticsearchService
+
+
+def _service():
+    config = SimpleNamespace(host='localhost', port=9200, use_ssl=False, username=None, password=None)
+    return ElasticsearchService(config)
+
+
+class ParallelBulkIndexTest(unittest.TestCase):
+    def test_documents_reach_bulk_endpoint(self):
+        service = _service()
+        client = service.get_client()
+        requests = []
+
+        def perform_request(method, url, headers=None, params=None, body=None):
+            lines = body.decode().splitlines() if isinstance(body, bytes) else body.splitlines()
+            requests.append((url, lines))
+            items = [{'index': {'status': 201}} for _ in lines[::2]]
+            return {'errors': False, 'items': items}
+
+        documents = [
+            {'id': 1, 'amount': Decimal('1.5')},
+            {'id': 2, 'big': 2 ** 70},
+        ]
+        with mock.patch.object(client.transport, 'perform_request', side_effect=perform_request):
+            results = list(service.parallel_bulk_index('orders', iter(documents), thread_count=1))
+
+        self.assertEqual([ok for ok, _ in results], [True, True])
+        self.assertEqual(len(requests), 1)
+        url, lines = requests[0]
+        self.assertEqual(url, '/orders/_bulk')
+        self.assertEqual(
+            [json.loads(line) for line in lines[1::2]],
+            [{'id': 1, 'amount': 1.5}, {'id': 2, 'big': 2 ** 70}]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
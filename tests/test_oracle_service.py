@@ -0,0 +1,40 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from services.oracle_service import OracleService
+
+
+def _service():
+    config = SimpleNamespace(host='localhost', port=1521, service_name='ORCL', username='scott', password='tiger')
+    return OracleService(config)
+
+
+class AnalysisCacheTest(unittest.TestCase):
+    def test_analysis_is_shared_across_instances(self):
+        query = "SELECT * FROM analysis_cache_orders"
+
+        with mock.patch.object(OracleService, '_scan_tables', autospec=True,
+                               side_effect=OracleService._scan_tables) as scan_tables:
+            with _service() as first:
+                first_analysis = first.analyze_query(query)
+            with _service() as second:
+                second_analysis = second.analyze_query(query)
+
+        self.assertEqual(scan_tables.call_count, 1)
+        self.assertEqual(first_analysis, second_analysis)
+        self.assertEqual(first_analysis['tables'], ['ANALYSIS_CACHE_ORDERS'])
+
+    def test_whitespace_variants_are_analyzed_separately(self):
+        query = "SELECT * FROM analysis_cache_items"
+
+        with mock.patch.object(OracleService, '_scan_tables', autospec=True,
+                               side_effect=OracleService._scan_tables) as scan_tables:
+            _service().analyze_query(query)
+            _service().analyze_query(query.replace(' ', '  '))
+
+        self.assertEqual(scan_tables.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()